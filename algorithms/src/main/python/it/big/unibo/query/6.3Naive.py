@@ -23,6 +23,7 @@ def process_df(df):
                    (df["frequency"] == frequency)
                ]
 
+#the executed queries are always read, also from a sample of the stats
 df=get_complete_stats_dataframe(process_df)
 
 result = df.groupby(["time", "inputFile", "dataset"]).agg(
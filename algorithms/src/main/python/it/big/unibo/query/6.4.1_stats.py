@@ -1,4 +1,5 @@
-from common import get_queries_statistics_by_time, round_numeric_columns
+from common import get_complete_stats_dataframe, get_estimated_queries_statistics, round_numeric_columns, error_aggregations
+from latency_statistics import get_latency_statistics_from_df
 import pandas as pd
 import numpy as np
 
@@ -24,18 +25,21 @@ def process_df(df):
             ]
 
 grouping_columns=["k", "inputFile", "dataset"]
-result = get_queries_statistics_by_time(process_df, grouping_columns)
+#the stats are read once, for the statistics by time and the latencies
+df = get_complete_stats_dataframe(process_df)
+result = get_estimated_queries_statistics(df, grouping_columns)
 
 def aggregate(df, columns):
-    return df.groupby(columns).agg(
-               total_time = ('total_time', 'mean'),
-               time_score = ('time_score', 'mean'),
-               time_choose_queries = ('time_choose_queries', 'mean'),
-               time_execute_queries = ('time_execute_queries', 'mean'),
-               total_queries = ('total_queries', 'mean'),
-               attributes_avg = ('attributes_avg', 'mean'),
-               measures_avg = ('measures_avg', 'mean'),
-           ).reset_index()
+    aggregations = {
+               'total_time': 'mean',
+               'time_score': 'mean',
+               'time_choose_queries': 'mean',
+               'time_execute_queries': 'mean',
+               'total_queries': 'mean',
+               'attributes_avg': 'mean',
+               'measures_avg': 'mean',
+    }
+    return df.groupby(columns).agg({**aggregations, **error_aggregations(df, aggregations)}).reset_index()
 
 time_statistics_inputFile = aggregate(result, grouping_columns)
 time_statistics_aggr = aggregate(time_statistics_inputFile, ["k", "dataset"])
@@ -63,3 +67,13 @@ print(time_statistics_aggr[[
 ]].to_latex(index=False, escape=False))
 
 time_statistics_aggr.to_csv("test/tables/6.4.1_time_aggr.csv", index=False)
+
+# tail latency of the panes and overruns of the available time
+latency_statistics = get_latency_statistics_from_df(df, ["k", "dataset"])
+latency_statistics = round_numeric_columns(latency_statistics, decimals=2)
+
+print(latency_statistics[[
+"k", "dataset", "totalTime_p50", "totalTime_p95", "totalTime_p99", "overrun_fraction"
+]].to_latex(index=False, escape=False))
+
+latency_statistics.to_csv("test/tables/6.4.1_time_quantiles.csv", index=False)
@@ -1,4 +1,4 @@
-from common import get_queries_statistics_by_time, round_numeric_columns, base_path, set_font
+from common import get_queries_statistics_by_time, round_numeric_columns, base_path, set_font, error_aggregations
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
@@ -27,12 +27,13 @@ grouping_columns = ["dataset", "inputFile", "maximumQueryCardinalityPercentage",
 result = get_queries_statistics_by_time(process_df, grouping_columns)
 
 def aggregate(df, columns):
-    return df.groupby(columns).agg({
+    aggregations = {
                   'TM': 'mean',
                   'VM': 'mean',
                   'SM': 'mean',
                   'QM': 'mean'
-              }).reset_index()
+              }
+    return df.groupby(columns).agg({**aggregations, **error_aggregations(df, aggregations)}).reset_index()
 
 result_file = aggregate(result, grouping_columns)
 
@@ -1,4 +1,5 @@
-from common import get_queries_statistics_by_time, round_numeric_columns, set_font
+from common import get_queries_statistics_by_time, round_numeric_columns, set_font, error_aggregations
+from decimation import decimate, set_time_ticks
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -39,7 +40,7 @@ aggregations = {
                    'change_sel': 'sum'
                }
 aggr_col = ["dataset", "alpha", "time"]
-result_file = result.groupby(aggr_col + ["inputFile"]).agg(aggregations).reset_index()
+result_file = result.groupby(aggr_col + ["inputFile"]).agg({**aggregations, **error_aggregations(result, aggregations)}).reset_index()
 
 def plotPaper(df):
     set_font()
@@ -63,7 +64,9 @@ def plotPaper(df):
         fig, (ax1, ax2) = plt.subplots(nrows=1, ncols=2, figsize=(12, 6))
         for i, v in enumerate(df_graph[graph_lines].unique()):
             subset = df_graph[df_graph[graph_lines] == v]
-            ax1.plot(subset[x1], subset[m1], marker = 'o', linestyle='-', label=v)
+            #downsample the long runs keeping the best query changes
+            plotted = decimate(subset, x1, m1, keep=subset[m2] > 0)
+            ax1.plot(plotted[x1], plotted[m1], marker = 'o', linestyle='-', label=v)
             #ax1.bar(positions[i], subset[m1].mean(), bar_width, label=v)
             ax2.bar(positions[i], subset[m2].sum(), bar_width, label=v)
         ax1.set_xlabel("Time")
@@ -71,7 +74,7 @@ def plotPaper(df):
         ax2.set_ylabel("Number of best query changes")
         ax1.set_ylabel("Best query support")
         ax1.set_ylim(0, 1.02)  # Set y-axis limits to 0-1
-        ax1.set_xticks([1] + [x for x in range(5, subset[x1].max() + 5, 5)])
+        set_time_ticks(ax1, [1] + [x for x in range(5, subset[x1].max() + 5, 5)])
         ax2.set_xticks(positions)
         ax2.set_xticklabels(df_graph[graph_lines].unique())
         #ax1.grid(True)
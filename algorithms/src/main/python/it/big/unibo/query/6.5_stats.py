@@ -1,4 +1,6 @@
-from common import get_queries_statistics_by_time, round_numeric_columns, plot_one_meas
+from common import get_queries_statistics_by_time, round_numeric_columns, plot_one_meas, error_aggregations
+from metrics import evaluate_metrics, algorithm_name, is_naive, naive_time_metrics, naive_aggregated_metrics
+from metrics import naive_algorithm as naiveAlgorithm, s1_algorithm as S1Alg, se_algorithm as SEAlg, ske_algorithm as SKEAlg
 import pandas as pd
 import matplotlib.pyplot as plt
 import numpy as np
@@ -14,11 +16,6 @@ percentage_records = state_records_percentage#0.01
 tolerance = 1e-8
 frequency = 10
 
-naiveAlgorithm = "\\texttt{NAIVE}"
-S1Alg = "\\texttt{A-S1}"
-SEAlg = "\\texttt{A-SE}"
-SKEAlg = "\\texttt{A-SKE}"
-
 markers = {
     naiveAlgorithm: None,
     S1Alg: 'o',
@@ -40,14 +37,6 @@ colors = {
   SKEAlg: "green"
 }
 
-def algorithm_name(row):
-    if row["isNaive"]:
-        return naiveAlgorithm
-    if row["single"] and row["knapsack"] == False:
-        return S1Alg
-    return SEAlg if row["knapsack"] == False else SKEAlg
-
-
 def process_df(df):
     df = df[
         (df['alpha'] == alpha) &
@@ -59,12 +48,12 @@ def process_df(df):
         (df["frequency"] == frequency)
        # (df["inputFile"].str.contains("knapsack") == False)
     ]
-    df["algorithm_name"] = df.apply(lambda r: algorithm_name(r), axis = 1)
+    df = evaluate_metrics(df, {"algorithm_name": algorithm_name})
     return df
 
 grouping_columns = ["dataset", "inputFile", "algorithm_name"]
 df = get_queries_statistics_by_time(process_df, grouping_columns)
-df["VM"] = df.apply(lambda r: (r['queryCardinalityLastPane_sum'] / (r["lastPaneRecords_max"] * state_records_percentage) if r["lastPaneRecords_max"] > 0 else 0) if r["algorithm_name"] == naiveAlgorithm else r["VM"], axis = 1)
+df = evaluate_metrics(df, naive_time_metrics(state_records_percentage))
 
 y = "support_sel_avg"
 y_label = "$supp(w_i.q^*)$"
@@ -86,10 +75,13 @@ aggregations = {
                 'total_time': 'mean'
 }
 
-result_aggr_file = df.groupby(["dataset", "inputFile", "algorithm_name"]).agg(aggregations).reset_index()
-result_aggr_file["QM"] = result_aggr_file.apply(lambda r: 1 if r["algorithm_name"] == naiveAlgorithm else r["QM"], axis = 1)
-result_aggr_file["SM"] = result_aggr_file.apply(lambda r: 1 if r["algorithm_name"] == naiveAlgorithm else r["SM"], axis = 1)
+result_aggr_file = df.groupby(["dataset", "inputFile", "algorithm_name"]).agg({**aggregations, **error_aggregations(df, aggregations)}).reset_index()
+result_aggr_file = evaluate_metrics(result_aggr_file, naive_aggregated_metrics)
+for c in ["QM_err", "SM_err"]:
+    if c in result_aggr_file.columns:
+        #the naive metrics are fixed, without error
+        result_aggr_file.loc[is_naive(result_aggr_file), c] = 0
 
-result_aggr = result_aggr_file.groupby(["dataset", "algorithm_name"]).agg(aggregations).reset_index()
+result_aggr = result_aggr_file.groupby(["dataset", "algorithm_name"]).agg({**aggregations, **error_aggregations(result_aggr_file, aggregations)}).reset_index()
 
 result_aggr.to_csv("test/tables/6.5_stats.csv", index=False)
\ No newline at end of file
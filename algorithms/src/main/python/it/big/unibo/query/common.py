@@ -4,6 +4,8 @@ import sys
 import os
 import numpy as np
 import math
+from metrics import evaluate_metrics, stats_metrics, time_metrics
+from decimation import decimate, set_time_ticks
 
 simulation_columns = [
     "alpha", "windowDuration", "slideDuration", "k",
@@ -17,21 +19,59 @@ algorithm_columns = [
 
 configuration_columns = simulation_columns + algorithm_columns
 
-def get_complete_stats_dataframe(process_df, datasets = ["synthetic"]):
+# number of replicate groups of a sample, for the estimation of the error bounds
+sample_replicates = 10
+# metrics of get_queries_statistics_by_time with error bounds in the approximate mode
+error_columns = ["TM", "VM", "SM", "QM", "Support_SM", "FD_SM", "score_sel_avg", "support_sel_avg", "total_time", "total_queries", "attributes_avg", "measures_avg"]
+
+def get_sampling():
+    """
+    Get the sampling from the command line arguments, a rate in ]0,1] or a row budget if greater than 1. None for exact stats.
+    """
+    return float(sys.argv[2]) if len(sys.argv) > 2 else None
+
+def get_sample_rate(sampling, datasets):
+    """
+    Get the sample rate of the stats rows, for a row budget it is computed from the number of lines of the stats files
+    (the stored, executed and selected queries are always read, so the rows read can be more than the budget).
+    Return None if the stats are read completely.
+    """
+    if sampling is None:
+        return None
+    if sampling > 1:
+        rows = []
+        def count_rows(base, base_dir):
+            with open(f"{base_path}{base}/stats.csv", "rb") as f:
+                rows.append(sum(chunk.count(b"\n") for chunk in iter(lambda: f.read(1 << 20), b"")) - 1)
+        for d in datasets:
+            process_directory(os.path.join(base_path, d), d, count_rows, "stats.csv")
+        sampling = sampling / max(sum(rows), 1)
+    return sampling if sampling < 1 else None
+
+def get_complete_stats_dataframe(process_df, datasets = ["synthetic"], sampling = get_sampling()):
+    """
+    Get the stats of all the simulations of the datasets, processed with the given function.
+    With sampling (a rate or a row budget) only a stratified sample of the rows is read, see get_stats_df.
+    """
     dataframes = []
+    sample_rate = get_sample_rate(sampling, datasets)
     #process the complete stats dataframe with the given function and concat all the dataframes
     def processing_function(base, base_dir):
         print(f"Processing {base}")
-        dataframes.append(process_df(get_stats_df(base)))
+        dataframes.append(process_df(get_stats_df(base, sample_rate)))
 
     for d in datasets:
         process_directory(os.path.join(base_path, d), d, processing_function, "stats.csv")
 
     df = pd.concat(dataframes, ignore_index=True)
+    return filter_panes(df)
 
+def filter_panes(df):
+    """
+    Keep the panes to consider for each dataset.
+    """
     #filter out when $D_{syn-k}$ and time > 10, keep the other datasets
-    df = df[~((df["dataset"] == "$D_{syn-k}$") & (df["time"] > 10))]
-    return df
+    return df[~((df["dataset"] == "$D_{syn-k}$") & (df["time"] > 10))]
 
 # Function to round numeric columns
 def round_numeric_columns(df, decimals=2):
@@ -83,22 +123,6 @@ def get_algorithm_string(row):
     #from a row with algorithm column return a string with the configuration
     return "N" if row["isNaive"] else f"sp={row['stateCapacity']:.3f}_kn={row['knapsack']}_s={row['single']}"
 
-def format_selection(row):
-    if row['selected'] and row['stored']:
-        return "SE"
-    elif row['stored']:
-        return "E"
-    elif row['selected'] and row['executed']:
-        return "Se"
-    elif row['executed']:
-        return "e"
-    elif row['selected']:
-        return "S"
-    elif pd.isna(row['score']):
-        return None
-    else:
-        return "N"
-
 def generate_line_styles(num_styles):
     """
     Generate a list of line styles to use in plots.
@@ -117,7 +141,7 @@ def get_color_map(df):
     Create a color map based on the stateCapacity and single columns of the DataFrame.
     """
     # Create a unique key by combining stateCapacity and single
-    df['composite_key'] = df.apply(lambda row: (row['stateCapacity'], row['single']), axis=1)
+    df['composite_key'] = pd.MultiIndex.from_frame(df[['stateCapacity', 'single']]).to_flat_index()
 
     # Get unique composite keys
     unique_composite_keys = df['composite_key'].unique()
@@ -159,6 +183,46 @@ def get_df(name, input_folder = get_input_folder()):
     df = df.drop(columns=['paneTime'])
     return df
 
+def get_stats_sample_df(input_folder, sample_rate, seed = 0):
+    """
+    Read a stratified sample of the stats.csv file, a stratum is a configuration in a pane.
+    The stored, executed and selected queries are always read, of the other queries of each stratum a random sample
+    of the sample rate with at least two rows. Of the skipped rows only the columns of the strata are parsed.
+    The rows have a weight (the inverse of their inclusion probability), their stratum, a replicate group for the error bounds
+    (-1 for the rows always read) and the time of their pane, numbered on all the panes as get_df.
+    """
+    file_name = f"{base_path}{input_folder}/stats.csv"
+    header = pd.read_csv(file_name, sep=',', quotechar='"', decimal='.', nrows=0).columns
+    strata_columns = [c for c in configuration_columns if c in header] + ["paneTime"]
+    keys = pd.read_csv(file_name, sep=',', quotechar='"', decimal='.', usecols=strata_columns + ["selected", "executed", "stored"])
+    keys["time"] = keys.groupby("paneTime").ngroup()
+    stratum = keys.groupby(strata_columns, dropna=False).ngroup()
+    always = (keys["selected"] == True) | (keys["executed"] == True) | (keys["stored"] == True)
+
+    others = stratum[~always]
+    population = others.map(others.value_counts())
+    size = np.minimum(population, np.maximum(2, np.round(population * sample_rate)))
+    rank = pd.Series(np.random.default_rng(seed).random(len(others)), index=others.index).groupby(others).rank(method="first")
+    sampled = rank <= size
+    keep = always.copy()
+    keep[others.index] = sampled
+    weight = pd.Series(1.0, index=keys.index)
+    weight[others.index] = population / size
+    # the sampled rows of each stratum are spread over the replicate groups, the strata read completely have no error
+    replicate = pd.Series(-1, index=keys.index)
+    partial = sampled & (size < population)
+    order = pd.DataFrame({"stratum": others[partial], "rank": rank[partial]}).sort_values(["stratum", "rank"]).index
+    replicate[order] = np.arange(len(order)) % sample_replicates
+
+    # the header is row 0
+    df = pd.read_csv(file_name, sep=',', quotechar='"', decimal='.', skiprows=np.flatnonzero(~keep.to_numpy()) + 1)
+    df["weight"] = weight[keep].to_numpy()
+    df["replicate"] = replicate[keep].to_numpy()
+    df["stratum"] = pd.Categorical(f"{input_folder}/" + stratum[keep].astype(str).to_numpy())
+    df["time"] = keys["time"][keep].to_numpy()
+    df = df.sort_values(by='paneTime')
+    return df.drop(columns=['paneTime'])
+
 def save_df_to_csv(df, name, index = True):
     """
     Save the DataFrame to a CSV file with the given name in the results folder.
@@ -177,13 +241,13 @@ def get_dataset(input_file, input_folder):
         if "synthetic" in dataset:
             return "$D_{syn}$"
 
-def get_stats_df(input_folder = get_input_folder()):
+def get_stats_df(input_folder = get_input_folder(), sample_rate = None):
     """
     Read the stats.csv file and return the DataFrame.
+    With a sample rate read a stratified sample of the queries, see get_stats_sample_df.
     """
-    df = get_df("stats", input_folder)
-    # Apply the function to create the 'info' column
-    df['selection'] = df.apply(format_selection, axis=1)
+    df = get_df("stats", input_folder) if sample_rate is None else get_stats_sample_df(input_folder, sample_rate)
+    df = evaluate_metrics(df, stats_metrics)
     df['algorithm'] = df.apply(lambda row: get_algorithm_string(row), axis=1)
     df['inputFile'] = df.apply(lambda row: get_reduced_in(row), axis=1)
     df['simulation'] = df.apply(lambda row: get_simulation_string(row), axis=1)
@@ -233,16 +297,79 @@ def process_directory(path, base, function, file_name):
     else:
         print(f"No subdirectories found in {path} with {file_name}.")
 
-def get_queries_statistics_by_time(process_df, grouping_columns, datasets = ["synthetic"]):
+def get_queries_statistics_by_time(process_df, grouping_columns, datasets = ["synthetic"], sampling = get_sampling()):
     """
     Get the statistics of queries executed by time. Considering executed, selected and total queries
+    With sampling (a rate or a row budget) the statistics are estimated from a sample of the stats,
+    with a column <metric>_err of the 95% error bound of each metric in error_columns.
+    """
+    sample_rate = get_sample_rate(sampling, datasets)
+    df = get_complete_stats_dataframe(process_df, datasets, sample_rate)
+    return get_estimated_queries_statistics(df, grouping_columns)
+
+def get_estimated_queries_statistics(df, grouping_columns):
+    """
+    Get the statistics of queries by time of a loaded stats DataFrame, if it is a sample (it has a weight column)
+    the statistics are estimated with their error bounds.
+    """
+    if "weight" not in df.columns:
+        return get_queries_statistics_from_df(df, grouping_columns)
+    result = get_queries_statistics_from_df(df, grouping_columns, "weight")
+    return add_error_bounds(result, df, grouping_columns)
+
+def add_error_bounds(result, df, grouping_columns):
+    """
+    Add the 95% error bounds of the metrics estimated from a sample, with a delete-a-group jackknife:
+    each replicate drops a replicate group and reweights the other sampled rows of their stratum to its number of queries,
+    the rows always read keep their weight.
+    """
+    columns = grouping_columns + ["time"]
+    sampled = df["replicate"] >= 0
+    sampled_weight = df["weight"].where(sampled, 0)
+    stratum_weight = sampled_weight.groupby(df["stratum"], observed=True).transform("sum")
+    estimates = []
+    for r in range(sample_replicates):
+        dropped = df["replicate"] == r
+        kept_weight = sampled_weight.where(~dropped, 0).groupby(df["stratum"], observed=True).transform("sum")
+        with np.errstate(invalid='ignore', divide='ignore'):
+            replicate_weight = np.where(dropped, 0, np.where(sampled, df["weight"] * stratum_weight / kept_weight, df["weight"]))
+        replicate = get_queries_statistics_from_df(df.assign(replicate_weight=replicate_weight), grouping_columns, "replicate_weight", fill_missing=False)
+        estimates.append(pd.merge(result[columns], replicate[columns + error_columns], on=columns, how="left")[error_columns].to_numpy(dtype=float))
+    # the metrics undefined (NaN or infinite) in a replicate are ignored, without any defined replicate the error is NaN
+    estimates = np.stack(estimates)
+    full = np.broadcast_to(result[error_columns].to_numpy(dtype=float), estimates.shape)
+    defined = np.isfinite(estimates) & np.isfinite(full)
+    deviations = np.where(defined, estimates, 0) - np.where(defined, full, 0)
+    variance = (sample_replicates - 1) / sample_replicates * np.sum(deviations ** 2, axis=0)
+    variance[~defined.any(axis=0)] = np.nan
+    for i, c in enumerate(error_columns):
+        result[f"{c}_err"] = 1.96 * np.sqrt(variance[:, i])
+    return result
+
+def mean_error(errors):
+    """
+    Error bound of the mean of independent estimates with the given error bounds, for the aggregation of the reports.
+    The undefined bounds are ignored, NaN if all of them are undefined.
+    """
+    return np.sqrt((errors ** 2).sum(min_count=1)) / len(errors)
+
+def error_aggregations(df, aggregations):
+    """
+    Aggregations of the error bounds of the metrics averaged by the given aggregations, if df has them (stats estimated from a sample).
+    """
+    return {f"{c}_err": mean_error for c, function in aggregations.items() if function == 'mean' and f"{c}_err" in df.columns}
+
+def get_queries_statistics_from_df(df, grouping_columns, weight = None, fill_missing = True):
+    """
+    Get the statistics of queries executed by time from an already loaded stats DataFrame (also with categorical columns).
+    With a weight column the stats are a sample (see get_stats_sample_df) and the statistics of all the queries are
+    weighted estimates, the stored, executed and selected queries are always read so their statistics are exact.
+    With fill_missing False the statistics undefined at a time are left NaN.
     """
-    df = get_complete_stats_dataframe(process_df, datasets)
-    df['change'] = df['notChange'] .apply(lambda x : 0 if x == 1 else 1)
     columns = grouping_columns + ["time"]
     executed_df = df[df["stored"] == True]
 
-    result_executed = executed_df.groupby(columns).agg(
+    result_executed = executed_df.groupby(columns, observed=True).agg(
        executed_queries=('executed','sum'),
        numberOfQueriesToExecute_max=('numberOfQueriesToExecute','max'),
        queryCardinalityLastPane_sum=('queryCardinalityLastPane','sum'),
@@ -254,30 +381,25 @@ def get_queries_statistics_by_time(process_df, grouping_columns, datasets = ["sy
        similarity_sum_ex=('similarity','sum'),
     ).reset_index()
 
-    result_tot = df.groupby(columns).agg(
-        total_queries = ('dimensions', 'size'), # total number of queries
-        total_time = ('totalTime', 'max'),
-        time_score = ('timeForScoreComputation', 'max'),
-        time_choose_queries = ('timeForChooseQueries', 'max'),
-        time_execute_queries = ('timeForQueryExecution', 'max'),
-        attributes_avg = ('numberOfAttributes', 'mean'),
-        measures_avg = ('measures', 'mean'),
-        score_sum=('score','sum')
-    )
+    if weight is None:
+        result_tot = df.groupby(columns, observed=True).agg(
+            total_queries = ('dimensions', 'size'), # total number of queries
+            total_time = ('totalTime', 'max'),
+            time_score = ('timeForScoreComputation', 'max'),
+            time_choose_queries = ('timeForChooseQueries', 'max'),
+            time_execute_queries = ('timeForQueryExecution', 'max'),
+            attributes_avg = ('numberOfAttributes', 'mean'),
+            measures_avg = ('measures', 'mean'),
+            score_sum=('score','sum')
+        )
+    else:
+        result_tot = get_weighted_totals(df, columns, weight)
     result_tot['extra_time'] = result_tot['total_time'] - (result_tot['time_score'] + result_tot['time_choose_queries'] + result_tot['time_execute_queries'])
     result = pd.merge(result_executed, result_tot, on=columns, how='outer')
-    # Total queries is the minimum between queries executed and to execute
-    result['queries'] = result[['numberOfQueriesToExecute_max', 'total_queries']].min(axis=1)
-    result['TM'] = result['executed_queries'] / result['queries']
-    result['VM'] = result['queryCardinalityLastPane_sum'] / result['lastPaneMaxRecords_max']
-    result['SM'] = result['score_sum_ex'] / result['score_sum']
-    result['Support_SM'] = result['score_support_sum_ex'] / result['total_queries']
-    result['FD_SM'] = result['similarity_sum_ex'] / result['total_queries']
-    #query eseguite rispetto al totale delle fattibili
-    result['QM'] = result['executed_queries'] / result["total_queries"]
+    result = evaluate_metrics(result, time_metrics)
 
     selected_df = df[df["selected"] == True]
-    result_selected = selected_df.groupby(columns).agg(
+    result_selected = selected_df.groupby(columns, observed=True).agg(
        score_sel_avg=('score','mean'),
        similarity_sel_avg=('similarity','mean'),
        support_sel_avg=('support','mean'),
@@ -285,11 +407,38 @@ def get_queries_statistics_by_time(process_df, grouping_columns, datasets = ["sy
        change_sel = ('change', 'max')
     ).reset_index()
     result = pd.merge(result, result_selected, on=columns, how='outer')
-    # Fill NaN values with zeros only for numerical columns
-    result[result.select_dtypes(include=[np.number]).columns] = result.select_dtypes(include=[np.number]).fillna(0)
+    if fill_missing:
+        # Fill NaN values with zeros only for numerical columns
+        result[result.select_dtypes(include=[np.number]).columns] = result.select_dtypes(include=[np.number]).fillna(0)
 
     return result
 
+def get_weighted_totals(df, columns, weight):
+    """
+    Estimate the statistics of all the queries by time from a sample, with the given weight column.
+    The times are the same for all the queries of a pane, so their maximum is the one of any query.
+    """
+    w = df[weight]
+    sums = df[columns].assign(
+        total_queries = w,
+        attributes_sum = df["numberOfAttributes"] * w,
+        attributes_weight = w.where(df["numberOfAttributes"].notna()),
+        measures_sum = df["measures"] * w,
+        measures_weight = w.where(df["measures"].notna()),
+        score_sum = df["score"] * w
+    ).groupby(columns, observed=True).sum()
+    result_tot = df.groupby(columns, observed=True).agg(
+        total_time = ('totalTime', 'max'),
+        time_score = ('timeForScoreComputation', 'max'),
+        time_choose_queries = ('timeForChooseQueries', 'max'),
+        time_execute_queries = ('timeForQueryExecution', 'max'),
+    )
+    result_tot.insert(0, "total_queries", sums["total_queries"])
+    result_tot["attributes_avg"] = sums["attributes_sum"] / sums["attributes_weight"]
+    result_tot["measures_avg"] = sums["measures_sum"] / sums["measures_weight"]
+    result_tot["score_sum"] = sums["score_sum"]
+    return result_tot
+
 font_size = 25
 def set_font():
     plt.rcParams.update({
@@ -325,6 +474,9 @@ def plot_one_meas(df, x, x_label, y, y_label, detail, graph_lines, lines_label,
             df_graph = df_reduced[df_reduced[graphs_value] == title]
             for v in df_graph[graph_lines].unique():
                 subset = df_graph[df_graph[graph_lines] == v]
+                change_points = subset[subset[change_col].diff() == 1]
+                #downsample the long runs keeping the change points
+                subset = decimate(subset, x, y, keep=subset[change_col].diff() == 1)
                 for row in range(nrows if len(graph_values) > 1 else ncols):
                     ax = axes[row, col] if len(graph_values) > 1 else axes[row]
                     ax.set_xlabel(x_label)
@@ -335,12 +487,11 @@ def plot_one_meas(df, x, x_label, y, y_label, detail, graph_lines, lines_label,
                         if y_limit:
                             ax.set_ylim(0, 1.1)  # Set y-axis limits to 0-1
                     else:
-                        change_points = subset[subset[change_col].diff() == 1]
                         #plot in the x the time and in the y the value of v. Plot a line of subset[change_col] where there is a x if the value of change_col is 1
                         ax.plot(subset[x], subset[graph_lines], linestyle= line_styles.get(v, '-'), label=v, color = colors.get(v, default_colors[v])) # marker = markers.get(v, 'o'),
                         #plot the change points
                         ax.scatter(change_points[x], change_points[graph_lines], color=colors.get(v, default_colors[v]), edgecolor='black', zorder=5, s=100)
-                    ax.set_xticks([x for x in range(1, subset[x].max() + 1, 1)])
+                    set_time_ticks(ax, range(1, subset[x].max() + 1, 1))
                 # Collect handles and labels for legend, avoiding duplicates
                 if v not in seen_labels:
                     handles.append(line)
@@ -0,0 +1,47 @@
+from common import process_directory, base_path, get_dataset, round_numeric_columns
+from dataset_profiler import profile_dataset, compare_with_engine
+import pandas as pd
+import os
+
+datasets = ["synthetic"]
+profiles = {}
+comparisons = []
+
+def profile_simulation(base, base_dir):
+    print(f"Profiling {base}")
+    path = os.path.join(base_path, base)
+    # the simulation settings are the ones of its stats
+    settings = pd.read_csv(os.path.join(path, "stats.csv"), usecols=["inputFile", "windowDuration", "slideDuration"], nrows=1).iloc[0]
+    key = (settings["inputFile"], settings["windowDuration"], settings["slideDuration"])
+    if key not in profiles:
+        profiles[key] = profile_dataset(settings["inputFile"], settings["windowDuration"], settings["slideDuration"])
+    panes, _ = profiles[key]
+    comparison = compare_with_engine(panes, os.path.join(path, "stats_dataset.csv"))
+    comparison["dataset"] = get_dataset(settings["inputFile"], base)
+    comparison["inputFile"] = os.path.basename(settings["inputFile"])
+    comparison["slideDuration"] = settings["slideDuration"]
+    comparison["records_per_second"] = comparison["records"] / (settings["slideDuration"] / 1000)
+    comparisons.append(comparison)
+
+for d in datasets:
+    process_directory(os.path.join(base_path, d), d, profile_simulation, "stats_dataset.csv")
+
+result = pd.concat(comparisons, ignore_index=True)
+result["support_abs_error"] = result["support_error"].abs()
+result["count_distinct_abs_relative_error"] = result["count_distinct_relative_error"].abs()
+
+def aggregate(df, columns):
+    return df.groupby(columns).agg(
+        records_per_second = ('records_per_second', 'mean'),
+        support_abs_error = ('support_abs_error', 'mean'),
+        support_abs_error_max = ('support_abs_error', 'max'),
+        count_distinct_abs_relative_error = ('count_distinct_abs_relative_error', 'mean'),
+        count_distinct_abs_relative_error_max = ('count_distinct_abs_relative_error', 'max'),
+        exact = ('exact', 'mean'),
+    ).reset_index()
+
+result_file = aggregate(result, ["dataset", "inputFile", "slideDuration", "dimension"])
+result_aggr = round_numeric_columns(aggregate(result, ["dataset", "inputFile", "slideDuration"]), decimals=3)
+
+print(result_aggr.to_latex(index=False, escape=False))
+result_file.to_csv("test/tables/dataset_profile.csv", index=False)
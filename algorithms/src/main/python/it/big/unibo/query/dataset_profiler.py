@@ -0,0 +1,173 @@
+"""
+Single-pass profiler of the datasets written by the generator.
+The dataset is read once in chunks, keeping only the sketches of the panes of the current window,
+and for each pane and window it computes the number of records, the support and the count distinct of each dimension.
+The count distinct uses mergeable sketches: exact (a set of value hashes) for small domains, HyperLogLog otherwise.
+"""
+from collections import deque
+import pandas as pd
+import numpy as np
+
+class DistinctSketch:
+    """
+    Mergeable count distinct sketch, exact up to exact_limit distinct values then HyperLogLog with 2^precision registers.
+    """
+    def __init__(self, precision = 12, exact_limit = 2048):
+        self.precision = precision
+        self.exact_limit = exact_limit
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self.registers = None
+
+    def add(self, hashes):
+        """
+        Add the 64 bit hashes of some values.
+        """
+        if self.registers is None:
+            self.hashes = np.union1d(self.hashes, hashes)
+            if len(self.hashes) > self.exact_limit:
+                self._to_registers()
+        else:
+            self._add_to_registers(hashes)
+        return self
+
+    def merge(self, other):
+        """
+        Return a new sketch with the values of the two sketches.
+        """
+        result = DistinctSketch(self.precision, self.exact_limit)
+        if self.registers is None and other.registers is None:
+            return result.add(np.union1d(self.hashes, other.hashes))
+        result._to_registers()
+        for sketch in [self, other]:
+            if sketch.registers is None:
+                result._add_to_registers(sketch.hashes)
+            else:
+                np.maximum(result.registers, sketch.registers, out=result.registers)
+        return result
+
+    def is_exact(self):
+        return self.registers is None
+
+    def count(self):
+        """
+        The (estimated) number of distinct values.
+        """
+        if self.registers is None:
+            return float(len(self.hashes))
+        m = len(self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros > 0:
+            # small range correction (linear counting)
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+    def _to_registers(self):
+        self.registers = np.zeros(1 << self.precision, dtype=np.uint8)
+        self._add_to_registers(self.hashes)
+        self.hashes = np.empty(0, dtype=np.uint64)
+
+    def _add_to_registers(self, hashes):
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.int64)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        # position of the leftmost 1 in the remaining bits, exact since they fit the float mantissa
+        _, bit_length = np.frexp(rest.astype(np.float64))
+        rank = (bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+def _parse_chunk(chunk):
+    """
+    Parse a chunk of the dataset (time, value columns) into one row for each dimension of each record,
+    as the engine a dimension is a not null attribute with a not numeric value.
+    """
+    attributes = chunk["value"].astype(str).str.replace("\"", "").str.split(",").explode()
+    attributes = attributes.str.strip().str.split("=", n=1, expand=True)
+    attributes.columns = ["dimension", "value"]
+    attributes["record"] = attributes.index
+    attributes["time"] = chunk["time"].loc[attributes.index].to_numpy()
+    value = attributes["value"]
+    is_null = value.isna() | value.isin(["null", "", "[]", "{}"])
+    is_numeric = pd.to_numeric(value, errors="coerce").notna()
+    return attributes[~is_null & ~is_numeric].drop_duplicates(["record", "dimension"]).reset_index(drop=True)
+
+def _window_statistics(panes):
+    """
+    Merge the statistics of the panes of a window, the last one gives the window pane time.
+    """
+    records = sum(pane["records"] for pane in panes)
+    supports = {}
+    sketches = {}
+    for pane in panes:
+        for d, (support, sketch) in pane["dimensions"].items():
+            supports[d] = supports.get(d, 0) + support
+            sketches[d] = sketch if d not in sketches else sketches[d].merge(sketch)
+    return records, {d: (supports[d], sketches[d]) for d in supports}
+
+def profile_dataset(file_name, window_duration, slide_duration, chunk_size = 100000, precision = 12, exact_limit = 2048):
+    """
+    Profile the dataset file, aligning the panes to the first record as the engine does.
+    Return two DataFrames, with the statistics of each pane and of each window (identified by its last pane time).
+    """
+    number_of_panes = int(window_duration // slide_duration)
+    window = deque(maxlen=number_of_panes)
+    open_panes = {}
+    pane_rows = []
+    window_rows = []
+    start = None
+
+    def rows(pane_time, records, dimensions):
+        return [{
+            "paneTime": pane_time,
+            "records": records,
+            "dimension": d,
+            "support": support / records if records > 0 else 0,
+            "count distinct": sketch.count(),
+            "exact": sketch.is_exact()
+        } for d, (support, sketch) in dimensions.items()]
+
+    def close_pane(pane_time):
+        pane = open_panes.pop(pane_time)
+        pane_rows.extend(rows(pane_time, pane["records"], pane["dimensions"]))
+        # empty panes between the closed ones still slide the window
+        while len(window) > 0 and window[-1]["paneTime"] + slide_duration < pane_time:
+            window.append({"paneTime": window[-1]["paneTime"] + slide_duration, "records": 0, "dimensions": {}})
+        window.append(pane)
+        records, dimensions = _window_statistics(window)
+        window_rows.extend(rows(pane_time, records, dimensions))
+
+    for chunk in pd.read_csv(file_name, sep=',', quotechar='"', chunksize=chunk_size):
+        if start is None:
+            start = chunk["time"].iloc[0]
+        chunk_panes = start + (chunk["time"] - start) // slide_duration * slide_duration
+        records = chunk_panes.value_counts()
+        attributes = _parse_chunk(chunk)
+        attributes["paneTime"] = start + (attributes["time"] - start) // slide_duration * slide_duration
+        attributes["hash"] = pd.util.hash_array(attributes["value"].to_numpy(dtype=object))
+        for pane_time, count in records.sort_index().items():
+            open_panes.setdefault(pane_time, {"paneTime": pane_time, "records": 0, "dimensions": {}})["records"] += count
+        for (pane_time, d), group in attributes.groupby(["paneTime", "dimension"]):
+            dimensions = open_panes[pane_time]["dimensions"]
+            support, sketch = dimensions.get(d, (0, DistinctSketch(precision, exact_limit)))
+            dimensions[d] = (support + len(group), sketch.add(group["hash"].to_numpy()))
+        # the data is sorted by time, so all the panes before the last one of the chunk are complete
+        for pane_time in sorted(p for p in open_panes if p < chunk_panes.iloc[-1]):
+            close_pane(pane_time)
+    for pane_time in sorted(open_panes):
+        close_pane(pane_time)
+    windows = pd.DataFrame(window_rows)
+    if len(windows) > 0:
+        windows.insert(1, "windowStart", windows["paneTime"] - (number_of_panes - 1) * slide_duration)
+    return pd.DataFrame(pane_rows), windows
+
+def compare_with_engine(panes, dataset_statistics_file):
+    """
+    Compare the profiled pane statistics with the ones written by the engine in the dataset statistics file.
+    """
+    engine = pd.read_csv(dataset_statistics_file, sep=',', quotechar='"', decimal='.')
+    engine = engine.groupby(["paneTime", "dimension"]).agg({"support": "mean", "count distinct": "mean"}).reset_index()
+    result = pd.merge(engine, panes, on=["paneTime", "dimension"], how="inner", suffixes=("_engine", ""))
+    result["support_error"] = result["support_engine"] - result["support"]
+    result["count_distinct_error"] = result["count distinct_engine"] - result["count distinct"]
+    result["count_distinct_relative_error"] = result["count_distinct_error"] / result["count distinct"]
+    return result
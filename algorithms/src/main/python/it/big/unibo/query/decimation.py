@@ -0,0 +1,69 @@
+"""
+Reduction of the time series before plotting.
+The long runs have thousands of panes, plotting all of them makes the figures slow to render and large,
+so the series are downsampled preserving their shape (largest triangle three buckets or min-max)
+and the points that must be seen (e.g. the change points of the best query) are always kept.
+"""
+import numpy as np
+from matplotlib.ticker import MaxNLocator
+
+def lttb(x, y, n_out):
+    """
+    Indices of the n_out points chosen by the largest triangle three buckets algorithm.
+    The first and last points are kept, in each bucket the point forming the largest triangle
+    with the previous chosen point and the average of the next bucket is chosen.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    edges = (np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(int) + 1
+    edges[-1] = n - 1
+    indices = np.empty(n_out, dtype=int)
+    indices[0] = 0
+    indices[-1] = n - 1
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        previous = indices[i]
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        indices[i + 1] = start + np.argmax(areas)
+    return indices
+
+def min_max(x, y, n_out):
+    """
+    Indices of the minimum and maximum of each of n_out / 2 buckets, plus the first and last points.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+    buckets = (np.arange(n) * (n_out // 2) // n)
+    order = np.lexsort((y, buckets))
+    starts = np.flatnonzero(np.diff(buckets[order], prepend=-1))
+    ends = np.append(starts[1:], n) - 1
+    return np.unique(np.concatenate([[0, n - 1], order[starts], order[ends]]))
+
+methods = {"lttb": lttb, "minmax": min_max}
+
+def decimate(df, x, y, max_points = 500, keep = None, method = "lttb"):
+    """
+    Downsample the rows of df (sorted by x) to about max_points, preserving the shape of y over x.
+    The rows where keep is True are always kept. The rows are returned in the same order.
+    """
+    if len(df) <= max_points:
+        return df
+    indices = methods[method](df[x].to_numpy(dtype=float), df[y].to_numpy(dtype=float), max_points)
+    if keep is not None:
+        indices = np.union1d(indices, np.flatnonzero(np.asarray(keep)))
+    return df.iloc[indices]
+
+def set_time_ticks(ax, ticks, max_ticks = 20):
+    """
+    Set the given ticks on the x axis, if they are too many let the axis choose at most max_ticks integer ticks.
+    """
+    ticks = list(ticks)
+    if len(ticks) <= max_ticks:
+        ax.set_xticks(ticks)
+    else:
+        ax.xaxis.set_major_locator(MaxNLocator(nbins=max_ticks, integer=True))
@@ -0,0 +1,32 @@
+from common import round_numeric_columns
+from knapsack_oracle import get_knapsack_gaps
+
+def process_df(df):
+    return df[(df["isNaive"] == False)]
+
+# simulation and algorithm identify the configuration of the pane
+grouping_columns = ["dataset", "inputFile", "simulation", "algorithm"]
+result = get_knapsack_gaps(process_df, grouping_columns)
+
+def aggregate(df, columns):
+    return df.groupby(columns).agg(
+        panes = ('time', 'size'),
+        engine_score = ('engine_score', 'mean'),
+        optimal_score = ('optimal_score', 'mean'),
+        score_gap = ('score_gap', 'mean'),
+        score_gap_max = ('score_gap', 'max'),
+        relative_gap = ('relative_gap', 'mean'),
+        # the panes without a known capacity have no optimum and are ignored by the means,
+        # a negative gap is an infeasible choice of the engine, not an optimal one
+        optimal_panes = ('score_gap', lambda x: (x.dropna().abs() <= 1e-9).mean()),
+        engine_feasible = ('engine_feasible', 'mean'),
+        exact = ('exact', 'mean'),
+        known_capacity = ('known_capacity', 'mean'),
+        naive_cardinalities = ('naive_cardinalities', 'mean'),
+    ).reset_index()
+
+result_configuration = aggregate(result, grouping_columns)
+result_algorithm = round_numeric_columns(aggregate(result, ["dataset", "algorithm"]), decimals=3)
+
+print(result_algorithm.to_latex(index=False, escape=False))
+result_configuration.to_csv("test/tables/knapsack_gap.csv", index=False)
@@ -0,0 +1,155 @@
+"""
+Offline oracle for the per-pane choice of the queries to store.
+For each pane it solves the problem of the Knapsack chooser: maximize the score of the stored queries with
+their records within lastPaneMaxRecords and at most numberOfQueriesToExecute queries (the time budget),
+using the real cardinality of the queries (queryCardinalityLastPane). The cardinality is known (not 0) only for the
+executed queries, so the ones of the other queries are taken from the naive runs on the same data, that execute all
+the queries of each pane. Without a naive run the oracle chooses among the executed queries.
+It is solved for all the panes together with a batched dynamic programming over NumPy arrays.
+"""
+import numpy as np
+import pandas as pd
+from common import get_complete_stats_dataframe
+
+# maximum number of cells of the dynamic programming table of a batch of panes
+max_batch_cells = 2 ** 23
+# the cardinality of a query in a pane depends only on the data of the pane
+naive_key_columns = ["dataset", "inputFile", "slideDuration", "frequency", "time", "dimensions"]
+
+def _solve(weights, scores, capacities, limits, capacity, limit):
+    """
+    Solve a batch of 0/1 knapsack problems with a limit on the number of items.
+    weights and scores are (panes, items) arrays, capacities and limits are the per-pane constraints,
+    capacity and limit are their maximum values in the batch. Return the best score of each pane.
+    """
+    panes, items = weights.shape
+    # best[p, c, w] is the best score of pane p using at most c items and at most w records
+    best = np.zeros((panes, limit + 1, capacity + 1))
+    positions = np.arange(capacity + 1)
+    for i in range(items):
+        shifted = positions[None, :] - weights[:, i, None]
+        fits = shifted >= 0
+        previous = np.take_along_axis(best[:, :-1, :], np.broadcast_to(np.maximum(shifted, 0)[:, None, :], (panes, limit, capacity + 1)), axis=2)
+        candidate = np.where(fits[:, None, :], previous + scores[:, i, None, None], -np.inf)
+        np.maximum(best[:, 1:, :], candidate, out=best[:, 1:, :])
+    return best[np.arange(panes), limits, capacities]
+
+def _solve_all(weights, scores, capacities, limits, items):
+    """
+    Solve the problems of all the panes, in batches of panes with similar sizes.
+    """
+    result = np.zeros(len(capacities))
+    order = np.lexsort((limits, capacities))
+    start = 0
+    while start < len(order):
+        # grow the batch while its table fits in max_batch_cells
+        end = start
+        limit = 0
+        while end < len(order):
+            batch_limit = max(limit, limits[order[end]])
+            if end > start and (end + 1 - start) * (batch_limit + 1) * (capacities[order[end]] + 1) > max_batch_cells:
+                break
+            limit = batch_limit
+            end += 1
+        batch = order[start:end]
+        batch_items = items[batch].max()
+        result[batch] = _solve(weights[batch, :batch_items], scores[batch, :batch_items], capacities[batch], limits[batch], capacities[batch].max(), limit)
+        start = end
+    return result
+
+def _scale(weights, capacities, max_capacity, round_up):
+    """
+    Scale the records of the panes with a capacity greater than max_capacity.
+    Rounding up the weights gives a feasible choice (a lower bound of the optimum), rounding down an upper bound.
+    """
+    factor = np.minimum(1.0, max_capacity / np.maximum(capacities, 1))
+    scaled_capacities = np.floor(capacities * factor + 1e-9).astype(np.int64)
+    scaled_weights = weights * factor[:, None]
+    scaled_weights = np.ceil(scaled_weights - 1e-9) if round_up else np.floor(scaled_weights + 1e-9)
+    return scaled_weights.astype(np.int64), scaled_capacities
+
+def get_naive_cardinalities(df):
+    """
+    Get the real cardinality of each query in each pane from the naive runs of the stats, that execute all the queries.
+    """
+    naive = df[(df["isNaive"] == True) & (df["executed"] == True)]
+    return naive.groupby(naive_key_columns, dropna=False).agg(
+        naive_cardinality=('queryCardinalityLastPane', 'max')
+    ).reset_index()
+
+def get_knapsack_gaps_from_df(df, grouping_columns, max_capacity = 4096, cardinalities = None):
+    """
+    Get for each pane (grouping_columns + time) the score of the stored queries and the optimal one.
+    The candidates of a pane are all the scored queries if cardinalities (see get_naive_cardinalities) has the pane
+    (naive_cardinalities True), otherwise only the executed queries, the only ones with a known cardinality.
+    Panes with a records capacity greater than max_capacity are solved on scaled records, so the optimum
+    is bounded between optimal_score (a feasible choice) and optimal_score_upper, otherwise they are equal.
+    Panes without candidates are not considered, the ones without a known capacity (0) have known_capacity False and no optimum.
+    """
+    columns = grouping_columns + ["time"]
+    df = df[df["score"].notna()]
+    if cardinalities is None:
+        df = df.assign(naive_cardinality=np.nan)
+    else:
+        df = pd.merge(df, cardinalities, on=naive_key_columns, how="left")
+    executed = df["executed"] == True
+    has_naive = df.groupby(columns, dropna=False)["naive_cardinality"].transform("count") > 0
+    # the stored queries are executed, so their cardinality is always known
+    df = df.assign(
+        weight=df["queryCardinalityLastPane"].where(executed, df["naive_cardinality"]),
+        has_naive=has_naive
+    )
+    df = df[executed | (has_naive & df["naive_cardinality"].notna())].sort_values(by=columns)
+    groups = df.groupby(columns, sort=False, dropna=False)
+    pane = groups.ngroup().to_numpy()
+    position = groups.cumcount().to_numpy()
+    panes = groups.agg(
+        capacity=('lastPaneMaxRecords', 'max'),
+        limit=('numberOfQueriesToExecute', 'max'),
+        candidate_queries=('score', 'size'),
+        naive_cardinalities=('has_naive', 'max'),
+    ).reset_index()
+    stored = df["stored"].to_numpy() == True
+    engine = pd.DataFrame({
+        "pane": pane,
+        "score": np.where(stored, df["score"].to_numpy(), 0),
+        "records": np.where(stored, df["queryCardinalityLastPane"].to_numpy(), 0),
+        "stored": stored
+    }).groupby("pane").sum()
+    panes["engine_score"] = engine["score"].to_numpy()
+    panes["engine_records"] = engine["records"].to_numpy()
+    panes["engine_queries"] = engine["stored"].to_numpy()
+    panes["engine_feasible"] = (panes["engine_records"] <= panes["capacity"]) & (panes["engine_queries"] <= panes["limit"])
+
+    weights = np.zeros((len(panes), panes["candidate_queries"].max() if len(panes) > 0 else 0), dtype=np.int64)
+    scores = np.zeros(weights.shape)
+    weights[pane, position] = df["weight"].to_numpy()
+    scores[pane, position] = df["score"].to_numpy()
+    capacities = panes["capacity"].to_numpy().astype(np.int64)
+    # the limit is not binding over the number of candidate queries
+    items = panes["candidate_queries"].to_numpy()
+    limits = np.minimum(panes["limit"].to_numpy(), items).astype(np.int64)
+
+    lower_weights, lower_capacities = _scale(weights, capacities, max_capacity, round_up=True)
+    panes["optimal_score"] = _solve_all(lower_weights, scores, lower_capacities, limits, items)
+    scaled = capacities > max_capacity
+    panes["optimal_score_upper"] = panes["optimal_score"]
+    if scaled.any():
+        upper_weights, upper_capacities = _scale(weights[scaled], capacities[scaled], max_capacity, round_up=False)
+        panes.loc[scaled, "optimal_score_upper"] = _solve_all(upper_weights, scores[scaled], upper_capacities, limits[scaled], items[scaled])
+    panes["exact"] = ~scaled
+    panes["known_capacity"] = capacities > 0
+    panes.loc[~panes["known_capacity"], ["optimal_score", "optimal_score_upper"]] = np.nan
+    panes["score_gap"] = panes["optimal_score"] - panes["engine_score"]
+    panes["score_gap_upper"] = panes["optimal_score_upper"] - panes["engine_score"]
+    # no relative gap if the optimum is 0 and the engine score is not
+    panes["relative_gap"] = (panes["score_gap"] / panes["optimal_score"].where(panes["optimal_score"] != 0)).where(panes["score_gap"] != 0, 0)
+    return panes
+
+def get_knapsack_gaps(process_df, grouping_columns, datasets = ["synthetic"], max_capacity = 4096):
+    """
+    Get the per-pane optimality gap of the queries stored by the algorithms,
+    the cardinalities of the queries not executed are the ones of the naive runs (also if process_df filters them out).
+    """
+    df = get_complete_stats_dataframe(lambda df: df, datasets, sampling=None)
+    return get_knapsack_gaps_from_df(process_df(df), grouping_columns, max_capacity, get_naive_cardinalities(df))
@@ -0,0 +1,132 @@
+"""
+Streaming quantile statistics of the pane latencies.
+The timings of each pane are summarized by mergeable quantile sketches, built in one pass over the stats files
+and merged by configuration, so the reports can expose the tail latency and the overruns of the available time.
+"""
+import os
+import numpy as np
+import pandas as pd
+from common import process_directory, base_path, get_stats_df, filter_panes
+
+time_columns = [
+    "totalTime", "timeForUpdateWindow", "timeForComputeQueryInTheWindow", "timeForGettingScores",
+    "timeForUpdateThePane", "timeForScoreComputation", "timeForChooseQueries", "timeForQueryExecution"
+]
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch in the t-digest style: the values are summarized by centroids (mean, weight),
+    that are smaller at the tails, so the high quantiles stay accurate with a bounded number of centroids.
+    """
+    def __init__(self, compression = 500):
+        self.compression = compression
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, values):
+        """
+        Add the values to the sketch.
+        """
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) > 0:
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, np.ones(len(values))]))
+        return self
+
+    def merge(self, other):
+        """
+        Return a new sketch with the values of the two sketches.
+        """
+        result = QuantileSketch(self.compression)
+        result.min = min(self.min, other.min)
+        result.max = max(self.max, other.max)
+        result._compress(np.concatenate([self.means, other.means]), np.concatenate([self.weights, other.weights]))
+        return result
+
+    def count(self):
+        return self.weights.sum()
+
+    def quantile(self, q):
+        """
+        The estimated q quantile(s), interpolating between the centroids.
+        """
+        if len(self.means) == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) > 0 else np.nan
+        total = self.weights.sum()
+        middles = np.cumsum(self.weights) - self.weights / 2
+        return np.interp(np.asarray(q) * total, np.concatenate([[0], middles, [total]]), np.concatenate([[self.min], self.means, [self.max]]))
+
+    def _compress(self, means, weights):
+        if len(means) == 0:
+            return
+        order = np.argsort(means, kind="stable")
+        means = means[order]
+        weights = weights[order]
+        total = weights.sum()
+        left = (np.cumsum(weights) - weights) / total
+        # k scale function of the t-digest, each centroid spans at most one unit of k
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * left - 1)
+        cluster = np.floor(k - k[0])
+        starts = np.flatnonzero(np.diff(cluster, prepend=-1))
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+def _add_panes(df, grouping_columns, sketches, overruns, compression):
+    """
+    Add the timings of the panes of the stats to the sketches and the overruns of their groups.
+    """
+    pane_columns = list(dict.fromkeys(grouping_columns + ["simulation", "algorithm", "time"]))
+    panes = df.groupby(pane_columns, dropna=False).agg(
+        {c: 'max' for c in time_columns + ["availableTime"]}
+    ).reset_index()
+    panes["overrun"] = panes["totalTime"] > panes["availableTime"]
+    for key, group in panes.groupby(grouping_columns, dropna=False):
+        previous = overruns.get(key, (0, 0))
+        overruns[key] = (previous[0] + group["overrun"].sum(), previous[1] + len(group))
+        for c in time_columns:
+            sketch = QuantileSketch(compression).add(group[c].to_numpy())
+            sketches[(key, c)] = sketch if (key, c) not in sketches else sketches[(key, c)].merge(sketch)
+
+def get_latency_statistics(process_df, grouping_columns, datasets = ["synthetic"], quantiles = [0.5, 0.95, 0.99], compression = 500):
+    """
+    Get for each group the quantiles of the pane timings (totalTime and each timeFor*) and the fraction of panes
+    whose totalTime overruns the availableTime. The stats files are read once, each pane counts once for its configuration.
+    """
+    sketches = {}
+    overruns = {}
+    def processing_function(base, base_dir):
+        print(f"Processing {base}")
+        _add_panes(filter_panes(process_df(get_stats_df(base))), grouping_columns, sketches, overruns, compression)
+
+    for d in datasets:
+        process_directory(os.path.join(base_path, d), d, processing_function, "stats.csv")
+    return _latency_statistics(sketches, overruns, grouping_columns, quantiles)
+
+def get_latency_statistics_from_df(df, grouping_columns, quantiles = [0.5, 0.95, 0.99], compression = 500):
+    """
+    Get the latency statistics of get_latency_statistics from an already loaded stats DataFrame.
+    A sample of the stats (see get_stats_sample_df) gives the same statistics, it has at least a query of each pane.
+    """
+    sketches = {}
+    overruns = {}
+    _add_panes(df, grouping_columns, sketches, overruns, compression)
+    return _latency_statistics(sketches, overruns, grouping_columns, quantiles)
+
+def _latency_statistics(sketches, overruns, grouping_columns, quantiles):
+    """
+    One row for each group with its quantiles and overrun fraction.
+    """
+    rows = []
+    for key, (overrun, panes) in overruns.items():
+        row = dict(zip(grouping_columns, key))
+        row["panes"] = panes
+        row["overrun_fraction"] = overrun / panes
+        for c in time_columns:
+            for q, value in zip(quantiles, sketches[(key, c)].quantile(quantiles)):
+                row[f"{c}_p{q * 100:g}"] = value
+        rows.append(row)
+    return pd.DataFrame(rows)
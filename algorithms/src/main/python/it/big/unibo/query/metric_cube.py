@@ -0,0 +1,154 @@
+"""
+Materialized cube of the per-time metrics.
+The stats are read once and reduced to mergeable partials (sums, counts and maxima) for each configuration and time,
+that can be rolled up to any grouping of the configuration dimensions. A query on the cube gives the same result
+of get_queries_statistics_by_time without reading the stats files again.
+"""
+import pandas as pd
+import numpy as np
+from common import get_complete_stats_dataframe
+from metrics import evaluate_metrics, time_metrics
+
+cube_file = "test/metric_cube.pkl"
+
+# configuration dimensions of the cube, the simulation and algorithm strings identify a configuration
+cube_dimensions = [
+    "dataset", "inputFile", "simulation", "algorithm", "k", "alpha", "stateCapacity", "maximumQueryCardinalityPercentage",
+    "frequency", "slideDuration", "windowDuration", "availableTime", "isNaive", "knapsack", "single"
+]
+
+# partials of the queries that are stored, selected and of all the feasible ones, with their roll up function
+stored_partials = {
+    "stored_queries": ("stored", "sum"),
+    "executed_queries": ("executed", "sum"),
+    "numberOfQueriesToExecute_max": ("numberOfQueriesToExecute", "max"),
+    "queryCardinalityLastPane_sum": ("queryCardinalityLastPane", "sum"),
+    "lastPaneMaxRecords_max": ("lastPaneMaxRecords", "max"),
+    "lastPaneRecords_max": ("lastPaneRecords", "max"),
+    "score_sum_ex": ("score", "sum"),
+    "support_ex_sum": ("support", "sum"),
+    "support_ex_count": ("support", "count"),
+    "similarity_sum_ex": ("similarity", "sum"),
+}
+total_partials = {
+    "total_queries": ("dimensions", "size"),
+    "total_time": ("totalTime", "max"),
+    "time_score": ("timeForScoreComputation", "max"),
+    "time_choose_queries": ("timeForChooseQueries", "max"),
+    "time_execute_queries": ("timeForQueryExecution", "max"),
+    "attributes_sum": ("numberOfAttributes", "sum"),
+    "attributes_count": ("numberOfAttributes", "count"),
+    "measures_sum": ("measures", "sum"),
+    "measures_count": ("measures", "count"),
+    "score_sum": ("score", "sum"),
+}
+selected_partials = {
+    "selected_queries": ("selected", "sum"),
+    "score_sel_sum": ("score", "sum"),
+    "score_sel_count": ("score", "count"),
+    "similarity_sel_sum": ("similarity", "sum"),
+    "similarity_sel_count": ("similarity", "count"),
+    "support_sel_sum": ("support", "sum"),
+    "support_sel_count": ("support", "count"),
+    "SupportLastPane_sel_sum": ("supportLastPaneReal", "sum"),
+    "SupportLastPane_sel_count": ("supportLastPaneReal", "count"),
+    "change_sel": ("change", "max"),
+}
+
+def _roll_up_function(function):
+    return "max" if function == "max" else "sum"
+
+def get_partials(df):
+    """
+    Reduce the stats to the partials of each configuration and time.
+    """
+    columns = {}
+    aggregations = {}
+    for mask, partials in [(df["stored"] == True, stored_partials), (None, total_partials), (df["selected"] == True, selected_partials)]:
+        for name, (column, function) in partials.items():
+            # the partials of a subset of the queries ignore the values of the other ones
+            values = df[column].astype(float) if df[column].dtype == bool else df[column]
+            columns[name] = values if mask is None else values.where(mask)
+            aggregations[name] = (name, function)
+    partials = pd.DataFrame(columns, index=df.index)
+    partials[cube_dimensions + ["time"]] = df[cube_dimensions + ["time"]]
+    return partials.groupby(cube_dimensions + ["time"], dropna=False).agg(**aggregations).reset_index()
+
+def roll_up(partials, grouping_columns):
+    """
+    Roll up the partials to the grouping columns and time, and compute the per-time metrics.
+    """
+    columns = grouping_columns + ["time"]
+    aggregations = {name: _roll_up_function(function) for p in [stored_partials, total_partials, selected_partials] for name, (_, function) in p.items()}
+    df = partials.groupby(columns, dropna=False, observed=True).agg(aggregations).reset_index()
+    has_stored = df["stored_queries"] > 0
+    has_selected = df["selected_queries"] > 0
+
+    result = df[columns].copy()
+    result["executed_queries"] = df["executed_queries"]
+    for name in ["numberOfQueriesToExecute_max", "queryCardinalityLastPane_sum", "lastPaneMaxRecords_max", "lastPaneRecords_max", "score_sum_ex"]:
+        result[name] = df[name]
+    result["support_ex_avg"] = df["support_ex_sum"] / df["support_ex_count"]
+    result["score_support_sum_ex"] = df["support_ex_sum"]
+    result["similarity_sum_ex"] = df["similarity_sum_ex"]
+    # as in get_queries_statistics_by_time the times without stored queries have no stored statistics
+    stored_columns = result.columns[len(columns):]
+    result[stored_columns] = result[stored_columns].where(has_stored)
+
+    for name in ["total_queries", "total_time", "time_score", "time_choose_queries", "time_execute_queries"]:
+        result[name] = df[name]
+    result["attributes_avg"] = df["attributes_sum"] / df["attributes_count"]
+    result["measures_avg"] = df["measures_sum"] / df["measures_count"]
+    result["score_sum"] = df["score_sum"]
+    result["extra_time"] = result["total_time"] - (result["time_score"] + result["time_choose_queries"] + result["time_execute_queries"])
+    result = evaluate_metrics(result, time_metrics)
+
+    for name in ["score_sel", "similarity_sel", "support_sel", "SupportLastPane_sel"]:
+        result[f"{name}_avg"] = (df[f"{name}_sum"] / df[f"{name}_count"]).where(has_selected)
+    result["change_sel"] = df["change_sel"].where(has_selected)
+    result[result.select_dtypes(include=[np.number]).columns] = result.select_dtypes(include=[np.number]).fillna(0)
+    return result
+
+def build_metric_cube(datasets = ["synthetic"], rollups = [], file_name = cube_file):
+    """
+    Build the cube from the stats of the datasets, with the roll ups of the given grouping columns, and store it in the file.
+    """
+    partials = get_partials(get_complete_stats_dataframe(lambda df: df, datasets, sampling=None))
+    for c in partials.select_dtypes(include=["object"]).columns:
+        partials[c] = partials[c].astype("category")
+    cube = {
+        "partials": partials,
+        "rollups": {tuple(columns): roll_up(partials, list(columns)) for columns in rollups}
+    }
+    pd.to_pickle(cube, file_name)
+    return cube
+
+def load_metric_cube(file_name = cube_file):
+    """
+    Load a cube stored with build_metric_cube.
+    """
+    return pd.read_pickle(file_name)
+
+def query_metric_cube(cube, grouping_columns, process_df = None):
+    """
+    Get the statistics of queries by time for the grouping columns, as get_queries_statistics_by_time.
+    process_df can filter the configurations using the cube dimensions and add new ones (e.g. from the algorithm flags).
+    """
+    if process_df is None and tuple(grouping_columns) in cube["rollups"]:
+        result = cube["rollups"][tuple(grouping_columns)].copy()
+    else:
+        partials = cube["partials"]
+        result = roll_up(partials if process_df is None else process_df(partials), grouping_columns)
+    for c in result.select_dtypes(include=["category"]).columns:
+        result[c] = result[c].astype(object)
+    return result
+
+if __name__ == "__main__":
+    # roll ups of the groupings of the reports
+    build_metric_cube(rollups=[
+        ["k", "inputFile", "dataset"],
+        ["dataset", "inputFile", "maximumQueryCardinalityPercentage", "stateCapacity"],
+        ["dataset", "inputFile", "alpha"],
+        ["inputFile", "frequency"],
+        ["inputFile", "slideDuration"],
+    ])
@@ -0,0 +1,88 @@
+"""
+Metric definitions. Each metric is a vectorized expression over the columns of a DataFrame,
+a set of metrics is a dict evaluated in order, so a metric can use the ones declared before it.
+"""
+import numpy as np
+
+naive_algorithm = "\\texttt{NAIVE}"
+s1_algorithm = "\\texttt{A-S1}"
+se_algorithm = "\\texttt{A-SE}"
+ske_algorithm = "\\texttt{A-SKE}"
+
+def evaluate_metrics(df, metrics):
+    """
+    Evaluate the metrics on the DataFrame, adding (or replacing) a column for each one.
+    """
+    for name, expression in metrics.items():
+        df[name] = expression(df)
+    return df
+
+def ratio(numerator, denominator):
+    """
+    Ratio between two columns.
+    """
+    return lambda df: df[numerator] / df[denominator]
+
+def override(name, condition, expression):
+    """
+    Value of expression where condition holds, the current value of the metric name elsewhere.
+    """
+    return lambda df: np.where(condition(df), expression(df), df[name])
+
+def is_naive(df):
+    return df["algorithm_name"] == naive_algorithm
+
+def algorithm_name(df):
+    """
+    Name of the algorithm that produced each stats row.
+    """
+    return np.select(
+        [df["isNaive"] == True, (df["single"] == True) & (df["knapsack"] == False), df["knapsack"] == False],
+        [naive_algorithm, s1_algorithm, se_algorithm],
+        ske_algorithm
+    )
+
+def selection(df):
+    """
+    Selection label of each stats row: S if selected, E if stored, e if executed (Se, SE if also selected),
+    N if none of them and None for rows without a score.
+    """
+    return np.select(
+        [df["selected"] & df["stored"], df["stored"], df["selected"] & df["executed"], df["executed"], df["selected"], df["score"].isna()],
+        ["SE", "E", "Se", "e", "S", None],
+        "N"
+    )
+
+# metrics of each stats row
+stats_metrics = {
+    "selection": selection,
+    "change": lambda df: np.where(df["notChange"] == 1, 0, 1),
+}
+
+# metrics of each pane (time), computed on the aggregation of get_queries_statistics_by_time
+time_metrics = {
+    # total queries is the minimum between queries executed and to execute
+    "queries": lambda df: np.fmin(df["numberOfQueriesToExecute_max"], df["total_queries"]),
+    "TM": ratio("executed_queries", "queries"),
+    "VM": ratio("queryCardinalityLastPane_sum", "lastPaneMaxRecords_max"),
+    "SM": ratio("score_sum_ex", "score_sum"),
+    "Support_SM": ratio("score_support_sum_ex", "total_queries"),
+    "FD_SM": ratio("similarity_sum_ex", "total_queries"),
+    # executed queries with respect to the feasible ones
+    "QM": ratio("executed_queries", "total_queries"),
+}
+
+def naive_time_metrics(state_capacity):
+    """
+    Per-time overrides for the naive algorithm, the VM is relative to the state capacity percentage of the pane records.
+    """
+    vm = lambda df: np.where(df["lastPaneRecords_max"] > 0, df["queryCardinalityLastPane_sum"] / (df["lastPaneRecords_max"] * state_capacity), 0)
+    return {
+        "VM": override("VM", is_naive, vm),
+    }
+
+# overrides for the naive algorithm, after the aggregation by file: it executes all the queries with the best score
+naive_aggregated_metrics = {
+    "QM": override("QM", is_naive, lambda df: 1),
+    "SM": override("SM", is_naive, lambda df: 1),
+}
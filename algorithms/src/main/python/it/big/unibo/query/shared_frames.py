@@ -0,0 +1,119 @@
+"""
+Parallel report jobs on a stats DataFrame loaded once.
+The columns of the frame are copied once into shared memory and each worker of the pool attaches to them,
+so the jobs (e.g. the statistics of different filters of a report) run in parallel without loading
+or pickling the stats again. The intended use in a report is:
+
+    handle, blocks = publish_stats(datasets)
+    try:
+        results = run_parallel(queries_statistics_by_time, [(process_df, grouping_columns), ...], handle=handle)
+    finally:
+        release_frame(blocks)
+
+The functions passed to the workers (and the process_df of the jobs) must be defined at module level,
+and the report must run under an if __name__ == "__main__" guard, since the workers can import it.
+"""
+import os
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import numpy as np
+from common import get_complete_stats_dataframe, get_estimated_queries_statistics, get_sampling
+
+# frame attached by the initializer of each worker process
+_worker_frame = None
+_worker_blocks = []
+
+def publish_frame(df):
+    """
+    Copy the columns of the DataFrame once into shared memory.
+    String columns are stored as categorical codes, their categories travel with the handle.
+    Return the handle to pass to the workers and the memory blocks to release at the end.
+    """
+    handle = []
+    blocks = []
+    try:
+        for col in df.columns:
+            values = df[col]
+            categories = None
+            array = values.to_numpy()
+            if array.dtype.kind == "O" or isinstance(values.dtype, pd.CategoricalDtype):
+                values = values.astype("category")
+                categories = values.cat.categories
+                array = values.cat.codes.to_numpy()
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+            handle.append((col, block.name, array.dtype.str, len(array), categories))
+    except Exception:
+        release_frame(blocks)
+        raise
+    return handle, blocks
+
+def attach_frame(handle):
+    """
+    Attach to a frame published with publish_frame, numeric and boolean columns are read-only views on the shared memory,
+    string columns are categoricals on the shared codes (each worker has only its copy of the categories).
+    The groupby on the categorical columns must use observed=True, to keep only the combinations in the stats.
+    Return the DataFrame and the attached blocks, that must stay open while the DataFrame is used.
+    """
+    columns = {}
+    blocks = []
+    for col, name, dtype, length, categories in handle:
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        array = np.ndarray((length,), dtype=dtype, buffer=block.buf)
+        array.flags.writeable = False
+        columns[col] = array if categories is None else pd.Categorical.from_codes(array, categories=categories)
+    return pd.DataFrame(columns, copy=False), blocks
+
+def release_frame(blocks):
+    """
+    Close and free the shared memory blocks created by publish_frame.
+    """
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+def publish_stats(datasets = ["synthetic"], sampling = get_sampling()):
+    """
+    Load the (unfiltered) stats of the datasets, or a sample of them, and publish them in shared memory.
+    """
+    df = get_complete_stats_dataframe(lambda df: df, datasets, sampling)
+    return publish_frame(df.reset_index(drop=True))
+
+def queries_statistics_by_time(df, process_df, grouping_columns):
+    """
+    Job with the statistics of get_queries_statistics_by_time of the stats filtered by process_df.
+    """
+    result = get_estimated_queries_statistics(process_df(df), grouping_columns)
+    # the grouping columns as in the loaded stats
+    for c in result.select_dtypes(include=["category"]).columns:
+        result[c] = result[c].astype(object)
+    return result
+
+def _attach_worker(handle):
+    global _worker_frame, _worker_blocks
+    _worker_frame, _worker_blocks = attach_frame(handle)
+
+def _run_job(function, job):
+    return function(_worker_frame, *job)
+
+def run_parallel(function, jobs, df = None, handle = None, processes = None):
+    """
+    Run function(df, *job) for each job in a pool of processes, each worker attaches once to the shared frame.
+    Pass either the DataFrame to publish for the run, or the handle of an already published frame.
+    The function must be defined at module level and should return a reduced result (e.g. aggregated statistics),
+    since it is sent back to the parent process. By default there is a process for each job, up to the number of CPUs.
+    Return the results in the order of the jobs.
+    """
+    if processes is None:
+        processes = max(1, min(len(jobs), os.cpu_count() or 1))
+    blocks = []
+    if handle is None:
+        handle, blocks = publish_frame(df.reset_index(drop=True))
+    try:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_attach_worker, initargs=(handle,)) as executor:
+            return list(executor.map(_run_job, [function] * len(jobs), jobs))
+    finally:
+        release_frame(blocks)